@@ -1,40 +1,67 @@
 import argparse
 import datetime as dt
+import importlib.metadata
 import json
 import os
+import re
 import shutil
 import socket
 import subprocess
 import sys
-from typing import Dict, List, Optional, Tuple
+import tempfile
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: faster decoding of runtime output when installed
+    orjson = None
 
 UTC = dt.timezone.utc
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter.
+loads = orjson.loads if orjson is not None else json.loads
+
 def which_runtime() -> str:
+    # Returns the executable path that was found, so it is run even if its
+    # directory is not on PATH.
     for rt in ("docker", "podman"):
-        if shutil.which(rt):
-            return rt
+        # Check the usual install location before walking every PATH entry.
+        usual = f"/usr/bin/{rt}"
+        if os.access(usual, os.X_OK):
+            return usual
+        found = shutil.which(rt)
+        if found:
+            return found
     print("ERROR: neither docker nor podman found in PATH", file=sys.stderr)
     sys.exit(2)
 
 def run(cmd: List[str]) -> Tuple[int, str, str]:
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    out, err = p.communicate()
-    return p.returncode, out, err
+    p = subprocess.run(cmd, check=False, capture_output=True, text=True)
+    return p.returncode, p.stdout, p.stderr
 
 def parse_time(s: Optional[str]) -> Optional[dt.datetime]:
     """Parse Docker/Podman RFC3339Nano like '2025-07-01T01:01:00.123456789Z' or '2025-07-01T01:01:00Z'."""
     if not s:
         return None
     s = s.strip()
+    # Fast path for the fixed-width UTC form every runtime emits.
+    if (len(s) >= 20 and s[4] == "-" and s[7] == "-" and s[10] == "T" and s[13] == ":" and s[16] == ":"
+            and s[-1] == "Z" and (len(s) == 20 or s[19] == ".")):
+        try:
+            return dt.datetime(
+                int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                int(s[11:13]), int(s[14:16]), int(s[17:19]), tzinfo=UTC,
+            )
+        except ValueError:
+            pass
     if s.endswith("Z"):
         s = s[:-1]
         tz = UTC
     else:
         tz = None
     # cut off subseconds if present (handle 9 ns digits, etc.)
-    if "." in s:
-        s = s.split(".", 1)[0]
+    s = s.partition(".")[0]
     try:
         dt_obj = dt.datetime.fromisoformat(s)
         if tz is not None:
@@ -45,40 +72,92 @@ def parse_time(s: Optional[str]) -> Optional[dt.datetime]:
     except Exception:
         return None
 
+def parse_ps_time(value) -> Optional[dt.datetime]:
+    """
+    Parse time fields of `ps --format '{{json .}}'`:
+    docker prints '2025-07-01 01:01:00 +0000 UTC', podman exposes epoch seconds.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return dt.datetime.fromtimestamp(value, tz=UTC) if value > 0 else None
+    if not isinstance(value, str) or not value:
+        return None
+    parts = value.split()
+    if len(parts) < 3:
+        return parse_time(value)
+    try:
+        stamp = f"{parts[0]} {parts[1].split('.', 1)[0]} {parts[2]}"
+        return dt.datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S %z").astimezone(UTC)
+    except ValueError:
+        # e.g. podman's humanized "2 hours ago"
+        return None
+
+def _iso_z(ts: dt.datetime) -> str:
+    """Format an aware UTC datetime as 'YYYY-MM-DDTHH:MM:SSZ'."""
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+
 def now_utc() -> dt.datetime:
     return dt.datetime.now(tz=UTC)
 
-def list_containers(runtime: str) -> List[Dict]:
+def list_containers(runtime: str, prefix: str = "") -> Iterator[Dict]:
     """
-    Returns a list of container summary dicts using --format '{{json .}}'
+    Yields container summary dicts using --format '{{json .}}'
     Fields include: ID, Names/Name, Image, CreatedAt, RunningFor, Status, ...
+    The output is one JSON object per line, so it is decoded while streaming
+    instead of buffering the whole listing. Lines that cannot contain a name
+    starting with `prefix` are dropped before decoding.
     """
+    # The name is always a JSON string value, so it appears as '"<prefix>...'.
+    needle = json.dumps(prefix, ensure_ascii=False)[:-1]
     # Docker uses .Names, Podman uses .Names or .Names? Both accept json . (with Name/Names).
-    code, out, err = run([runtime, "ps", "-a", "--format", "{{json .}}"])
-    if code != 0:
+    cmd = [runtime, "ps", "-a", "--format", "{{json .}}"]
+    if prefix:
+        # Both runtimes treat the name filter as a regex; let the daemon do the filtering.
+        cmd[3:3] = ["--filter", f"name=^{re.escape(prefix)}"]
+    # stderr goes to a file: a piped stderr that is only read after stdout hits
+    # EOF would block the runtime (and hang us) once it fills the pipe buffer.
+    with tempfile.TemporaryFile() as errf:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errf, text=True) as p:
+            for line in p.stdout:
+                line = line.strip()
+                if not line or needle not in line:
+                    continue
+                try:
+                    yield loads(line)
+                except json.JSONDecodeError:
+                    # ignore unparsable lines
+                    continue
+        errf.seek(0)
+        err = errf.read().decode(errors="replace")
+    if p.returncode != 0:
         print(f"ERROR: failed to list containers with {runtime}: {err.strip()}", file=sys.stderr)
         sys.exit(3)
-    containers = []
-    for line in out.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            containers.append(json.loads(line))
-        except json.JSONDecodeError:
-            # ignore unparsable lines
-            continue
-    return containers
 
-def inspect_container(runtime: str, cid: str) -> Dict:
-    code, out, err = run([runtime, "inspect", cid])
-    if code != 0:
+def inspect_containers(runtime: str, cids: List[str]) -> Dict[str, Dict]:
+    """
+    Inspect all given containers with a single runtime call.
+    Returns {requested_id: inspect_dict}; `ps` reports short IDs while inspect
+    returns the full .Id, so results are matched back by prefix.
+    """
+    if not cids:
         return {}
+    # A vanished container makes inspect exit non-zero, but the others are
+    # still printed to stdout, so the exit code is not checked here.
+    code, out, err = run([runtime, "inspect", *cids])
     try:
-        data = json.loads(out)
-        return data[0] if isinstance(data, list) and data else {}
+        data = loads(out)
     except json.JSONDecodeError:
         return {}
+    if not isinstance(data, list):
+        return {}
+    wanted = set(cids)
+    widths = {len(cid) for cid in cids}
+    found: Dict[str, Dict] = {}
+    for item in data:
+        full_id = item.get("Id") or ""
+        for width in widths:
+            if full_id[:width] in wanted:
+                found[full_id[:width]] = item
+    return found
 
 def container_last_event_ts(info: Dict) -> Optional[dt.datetime]:
     """
@@ -94,8 +173,40 @@ def container_last_event_ts(info: Dict) -> Optional[dt.datetime]:
         return None
     return max(candidates)
 
+def needs_inspect(summary: Dict) -> bool:
+    """Exited/dead containers need State.FinishedAt, which only inspect reports."""
+    status = summary.get("Status") or ""
+    state = summary.get("State") or ""
+    if isinstance(state, str) and state.lower() in ("exited", "dead"):
+        return True
+    return "Exited" in status or "Dead" in status
+
+def summary_last_event_ts(summary: Dict) -> Optional[dt.datetime]:
+    """
+    Timestamp for a not-exited container taken straight from its `ps` summary:
+    StartedAt (podman) or CreatedAt/Created, whichever is latest.
+    Docker's summary has no StartedAt, so for a restarted container this is
+    older than the real start; callers re-check out-of-window values via inspect.
+    """
+    candidates = [
+        t for t in (parse_ps_time(summary.get(k)) for k in ("StartedAt", "CreatedAt", "Created"))
+        if t is not None
+    ]
+    if not candidates:
+        return None
+    return max(candidates)
+
+@lru_cache(maxsize=None)
 def get_ansible_version() -> Optional[str]:
-    # Try to run `ansible --version` locally (host). Fall back to env ANSIBLE_VERSION.
+    # Read the installed package metadata first: `ansible --version` imports the
+    # whole ansible stack just to print it. Then try the binary, then env ANSIBLE_VERSION.
+    # The engine is ansible-core (>= 2.11) or ansible-base (2.10); "ansible" is
+    # the collections bundle on those releases and only the engine before 2.10.
+    for dist in ("ansible-core", "ansible-base", "ansible"):
+        try:
+            return importlib.metadata.version(dist)
+        except importlib.metadata.PackageNotFoundError:
+            continue
     ansible_bin = shutil.which("ansible")
     if ansible_bin:
         code, out, err = run([ansible_bin, "--version"])
@@ -123,7 +234,7 @@ def main():
     args = parser.parse_args()
 
     runtime = which_runtime() if args.runtime == "auto" else args.runtime
-    containers = list_containers(runtime)
+    containers = list_containers(runtime, args.prefix)
 
     # Filter by prefix against .Names (docker) or .Names/.Name (podman format variants)
     target = []
@@ -132,17 +243,33 @@ def main():
         # Some runtimes may return a list of names; normalize.
         if isinstance(name, list):
             name = name[0] if name else ""
+        # Defensive: the runtime already filtered by name, but older ones match substrings.
         if isinstance(name, str) and name.startswith(args.prefix):
-            target.append((name, c.get("ID") or c.get("Id") or ""))
+            target.append((name, c.get("ID") or c.get("Id") or "", c))
 
     jobs: Dict[str, str] = {}
     unhealthy = False
     window = dt.timedelta(hours=args.hours)
     now = now_utc()
 
-    for name, cid in target:
-        info = inspect_container(runtime, cid)
-        last_ts = container_last_event_ts(info)
+    # The ps summary is enough for running/created containers within the window.
+    # Exited ones, those without a usable time, and those whose summary time is
+    # outside the window (docker reports no StartedAt, so a recently restarted
+    # container looks old) go through the single batched inspect.
+    last_seen: Dict[str, Optional[dt.datetime]] = {}
+    to_inspect = []
+    for name, cid, c in target:
+        last_seen[name] = None if needs_inspect(c) else summary_last_event_ts(c)
+        stale = last_seen[name] is None or (now - last_seen[name]) > window
+        if stale and cid:
+            to_inspect.append((name, cid))
+
+    infos = inspect_containers(runtime, [cid for _, cid in to_inspect])
+    for name, cid in to_inspect:
+        last_seen[name] = container_last_event_ts(infos.get(cid, {})) or last_seen[name]
+
+    for name, _, _ in target:
+        last_ts = last_seen[name]
         if not last_ts:
             # no timestamps available — mark as unseen
             jobs[name] = "last_seen: unknown"
@@ -150,9 +277,9 @@ def main():
             continue
 
         if (now - last_ts) <= window:
-            jobs[name] = f"executed_at: {last_ts.replace(tzinfo=UTC).isoformat().replace('+00:00', 'Z')}"
+            jobs[name] = f"executed_at: {_iso_z(last_ts)}"
         else:
-            jobs[name] = f"last_seen: {last_ts.replace(tzinfo=UTC).isoformat().replace('+00:00', 'Z')}"
+            jobs[name] = f"last_seen: {_iso_z(last_ts)}"
             unhealthy = True
 
     # If no jobs matched, decide status: usually that's unhealthy for monitoring;
@@ -160,7 +287,7 @@ def main():
     status = "healthy" if not unhealthy else "unhealthy"
 
     payload = {
-        "timestamp": now.isoformat().replace("+00:00", "Z"),
+        "timestamp": _iso_z(now),
         "host": args.host,
         "ansible_version": get_ansible_version() or "unknown",
         "ansible_user": get_ansible_user(),
@@ -1,30 +1,49 @@
 import json
+import re
 import sys
 
-end_result = {"message":{"status":"non-compliant"}}
-message={}
-
 def write_to_json(text):
     with open('json_log.json', 'w', encoding='utf-8') as f:
         json.dump(text, f, ensure_ascii=False, indent=4)
 
-def get_ssh_config_log(path_to_sshd, json_with_defaults):
-    with open(path_to_sshd, 'r', encoding='utf-8') as f:
-        all_lines = f.readlines()
-        with open(json_with_defaults, 'r', encoding='utf-8') as f:
-            defaults = json.load(f)
-            for key in defaults.keys():
-                for line in all_lines:
-                    if key in line and "#" not in line:
-                        splited_line = line.split()
-                        if defaults[key] == splited_line[-1]:
-                            message.update({f"{key}": splited_line[-1]})
-                            end_result["message"].update(message)
-                        else:
-                            message.update({f"{key}": splited_line[-1]})
-                            end_result["message"]["status"] = "compliant"
-                            write_to_json(end_result)
-        write_to_json(end_result)
+def load_defaults(json_with_defaults):
+    with open(json_with_defaults, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_ssh_config_log(path_to_sshd, defaults):
+    # Keeps no module state, so several configs can be checked against one
+    # loaded defaults dict (also from threads).
+    end_result = {"message": {"status": "non-compliant"}}
+    # sshd keywords are case-insensitive; keep the original spelling for the log.
+    # The config is scanned as raw bytes and only matched values are decoded.
+    defaults_ci = {k.lower().encode(): (k, str(v).encode()) for k, v in defaults.items()}
+    if not defaults_ci:
+        return end_result
+    # One regex for all monitored keywords: a whole keyword at line start,
+    # separated by whitespace or "=" (both valid in sshd_config), then the
+    # last value token before an optional trailing comment.
+    pattern = re.compile(
+        rb'^[ \t]*(' + b'|'.join(re.escape(k) for k in defaults_ci) + rb')(?:[ \t]*=[ \t]*|[ \t]+)'
+        rb'(?:[^#\r\n]*[ \t])?([^\s#]+)[ \t]*(?:#[^\r\n]*)?\r?$',
+        re.IGNORECASE | re.MULTILINE,
+    )
+    # sshd uses the first value it sees for a keyword, so stop once every key matched
+    remaining = set(defaults_ci)
+    with open(path_to_sshd, 'rb') as f:
+        data = f.read()
+    for m in pattern.finditer(data):
+        key_ci = m.group(1).lower()
+        if key_ci not in remaining:
+            continue
+        remaining.discard(key_ci)
+        key, expected = defaults_ci[key_ci]
+        value = m.group(2)
+        end_result["message"][key] = value.decode('utf-8')
+        if expected != value:
+            end_result["message"]["status"] = "compliant"
+        if not remaining:
+            break
+    return end_result
 
 if __name__ == '__main__':
-    get_ssh_config_log(sys.argv[1], sys.argv[2])
\ No newline at end of file
+    write_to_json(get_ssh_config_log(sys.argv[1], load_defaults(sys.argv[2])))
\ No newline at end of file